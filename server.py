@@ -5,15 +5,27 @@ A FastMCP server for IceMail support operations.
 """
 
 import os
-import json
+import time
+import random
+import asyncio
 import logging
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from typing import Optional
 
 import httpx
+import orjson
 from fastmcp import FastMCP
 from pydantic import Field
 
+# uvloop roughly doubles event-loop throughput for I/O-bound servers.
+# POSIX-only, so fall back to the default loop where it's unavailable.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+
 # ============== Configuration ==============
 
 BASE_URL = os.getenv("ICEMAIL_BASE_URL", "https://app.icemail.ai/api/support")
@@ -21,6 +33,8 @@ API_KEY = os.getenv("ICEMAIL_API_KEY", "")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+CACHE_TTL = int(os.getenv("ICEMAIL_CACHE_TTL", "60"))
+FANOUT_ENABLED = os.getenv("ICEMAIL_FANOUT", "0") == "1"
 
 # ============== Logging Setup ==============
 
@@ -32,33 +46,48 @@ logger = logging.getLogger("icemail-mcp")
 
 # ============== HTTP Client ==============
 
+# Built once at import; rebuilding the dict per request is wasted work.
+_HEADERS = {
+    "Content-Type": "application/json",
+    **({"Authorization": f"Bearer {API_KEY}"} if API_KEY else {})
+}
+
+# Timeout and pool limits are constants; build them once rather than on
+# every client (re)construction. The transport itself is created per
+# client since closing a client closes its transport.
+_TIMEOUT = httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+_LIMITS = httpx.Limits(
+    max_keepalive_connections=20,
+    max_connections=100,
+    keepalive_expiry=30.0
+)
+
 # Global async client for connection pooling
 _client: Optional[httpx.AsyncClient] = None
+_client_lock = asyncio.Lock()
 
 
 async def get_client() -> httpx.AsyncClient:
     """Get or create the async HTTP client with connection pooling."""
     global _client
     if _client is None or _client.is_closed:
-        headers = {"Content-Type": "application/json"}
-        if API_KEY:
-            headers["Authorization"] = f"Bearer {API_KEY}"
-        
-        # Production settings: connection pooling, retries, timeouts
-        transport = httpx.AsyncHTTPTransport(
-            retries=MAX_RETRIES,
-            limits=httpx.Limits(
-                max_keepalive_connections=20,
-                max_connections=100,
-                keepalive_expiry=30.0
-            )
-        )
-        _client = httpx.AsyncClient(
-            base_url=BASE_URL,
-            headers=headers,
-            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0),
-            transport=transport
-        )
+        # Serialize construction so a burst of tool calls on cold start
+        # can't race and leak a second client's connections.
+        async with _client_lock:
+            if _client is None or _client.is_closed:
+                # http2/limits must be set on the transport: httpx ignores
+                # the client-level kwargs when an explicit transport= is
+                # supplied.
+                _client = httpx.AsyncClient(
+                    base_url=BASE_URL,
+                    headers=_HEADERS,
+                    timeout=_TIMEOUT,
+                    transport=httpx.AsyncHTTPTransport(
+                        retries=MAX_RETRIES,
+                        limits=_LIMITS,
+                        http2=True
+                    )
+                )
     return _client
 
 
@@ -70,6 +99,124 @@ async def close_client():
         _client = None
 
 
+# ============== Serialization ==============
+
+# LLM consumers never need pretty-printed JSON; indent=2 roughly doubles
+# the encoder work and the bytes pushed through MCP framing. Only emit
+# it when a human is reading the output at DEBUG level.
+_JSON_OPTS = orjson.OPT_INDENT_2 if LOG_LEVEL.upper() == "DEBUG" else 0
+
+
+def _dumps(obj) -> str:
+    """Serialize a tool result to the JSON string returned over MCP."""
+    return orjson.dumps(obj, option=_JSON_OPTS).decode()
+
+
+# ============== Fanout Helper ==============
+
+_FANOUT_CHUNK = 10
+_FANOUT_CONCURRENCY = 8
+
+
+async def _fanout(
+    method: str,
+    endpoint: str,
+    items: list,
+    item_key: str,
+    base: Optional[dict] = None,
+    chunk: int = _FANOUT_CHUNK,
+    concurrency: int = _FANOUT_CONCURRENCY
+) -> str:
+    """
+    Split a list-argument call into chunked parallel backend requests.
+
+    When the backend processes list items sequentially, one request with
+    a large list stalls the whole tool response. Chunking the list and
+    issuing the chunks concurrently over the multiplexed client overlaps
+    the per-chunk latency; a semaphore bounds the burst.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(part: list) -> str:
+        async with sem:
+            return await api_request(method, endpoint, json={**(base or {}), item_key: part})
+
+    chunks = [items[i:i + chunk] for i in range(0, len(items), chunk)]
+    results = await asyncio.gather(*(one(c) for c in chunks))
+    return _dumps([orjson.loads(r) for r in results])
+
+
+# ============== Response Cache ==============
+
+class TTLCache:
+    """In-memory LRU cache with per-entry TTL for read-only lookups."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+_cache = TTLCache(maxsize=512, ttl=CACHE_TTL)
+
+# Single-flight map: concurrent duplicate reads share one backend call
+# instead of each missing the cache while the first is still in flight.
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def cached_request(tool: str, method: str, endpoint: str, **kwargs) -> str:
+    """
+    api_request wrapper for read-only tools.
+
+    Caches successful responses by tool name + normalized arguments so
+    agent retry loops don't re-hit the backend, and deduplicates
+    concurrent identical requests so only one hits the wire. Errors are
+    never cached.
+    """
+    args = kwargs.get("json") or kwargs.get("params") or {}
+    key = f"{tool}:{orjson.dumps(args, option=orjson.OPT_SORT_KEYS).decode()}"
+    cached = _cache.get(key)
+    if cached is not None:
+        logger.debug(f"Cache hit: {key}")
+        return cached
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        logger.debug(f"Joining in-flight request: {key}")
+        return await pending
+
+    fut: asyncio.Future = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await api_request(method, endpoint, **kwargs)
+        _cache.set(key, result)
+        fut.set_result(result)
+        return result
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved so lone failures don't warn at GC
+        raise
+    finally:
+        del _inflight[key]
+
+
 # ============== Lifecycle Management ==============
 
 @asynccontextmanager
@@ -78,6 +225,16 @@ async def lifespan(app):
     logger.info(f"Starting IceMail MCP Server")
     logger.info(f"API Base URL: {BASE_URL}")
     logger.info(f"API Key configured: {'Yes' if API_KEY else 'No'}")
+
+    # Warm the pooled connection so the first tool call doesn't pay the
+    # TCP+TLS handshake; any response (even an error) establishes it.
+    try:
+        client = await get_client()
+        await client.get("/user", params={"domain": "__warmup__"}, timeout=5.0)
+        logger.debug("Connection warmup complete")
+    except Exception as e:
+        logger.debug(f"Connection warmup skipped: {e}")
+
     yield
     logger.info("Shutting down IceMail MCP Server")
     await close_client()
@@ -90,33 +247,93 @@ mcp = FastMCP("icemail-support-mcp", lifespan=lifespan)
 
 # ============== Helper Functions ==============
 
-async def api_request(method: str, endpoint: str, **kwargs) -> str:
+# Transient upstream failures worth retrying at the application level.
+# The transport's retries= only covers connection errors, not these.
+_RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Jittered exponential backoff, honoring Retry-After when present."""
+    delay = min(0.25 * 2 ** attempt, 5.0) + random.random() * 0.1
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+    return delay
+
+
+async def api_request(method: str, endpoint: str, raw: bool = True, **kwargs) -> str:
     """
     Make an API request with proper error handling.
-    
+
+    Transient failures (429/502/503/504 and timeouts) are retried up to
+    MAX_RETRIES times with jittered exponential backoff before the
+    error is surfaced to the caller.
+
     Args:
         method: HTTP method (get, post, put, delete)
         endpoint: API endpoint path
+        raw: Return the backend's JSON text as-is instead of paying a
+            decode/re-encode round trip; pass False when the caller
+            needs the response normalized
         **kwargs: Additional arguments for the request
-    
+
     Returns:
         JSON string response
-    
+
     Raises:
         Exception with detailed error message on failure
     """
     client = await get_client()
-    
+    method = method.upper()
+
     try:
-        logger.debug(f"API Request: {method.upper()} {endpoint}")
-        
-        response = await getattr(client, method)(endpoint, **kwargs)
-        response.raise_for_status()
-        
-        result = response.json()
+        logger.debug(f"API Request: {method} {endpoint}")
+
+        # Encode the payload ourselves with orjson rather than letting
+        # httpx run it through stdlib json.
+        if "json" in kwargs:
+            kwargs["content"] = orjson.dumps(kwargs.pop("json"))
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                # client.request() directly; the get/post/put conveniences
+                # just allocate a bound method and route back to it anyway.
+                response = await client.request(method, endpoint, **kwargs)
+                response.raise_for_status()
+                break
+            except httpx.HTTPStatusError as e:
+                if attempt == MAX_RETRIES or e.response.status_code not in _RETRY_STATUSES:
+                    raise
+                delay = _retry_delay(attempt, e.response)
+                logger.warning(
+                    f"Retryable status {e.response.status_code} from {endpoint}, "
+                    f"retrying in {delay:.2f}s (attempt {attempt + 1}/{MAX_RETRIES})"
+                )
+                await asyncio.sleep(delay)
+            except httpx.TimeoutException:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = _retry_delay(attempt)
+                logger.warning(
+                    f"Timeout from {endpoint}, retrying in {delay:.2f}s "
+                    f"(attempt {attempt + 1}/{MAX_RETRIES})"
+                )
+                await asyncio.sleep(delay)
+
         logger.debug(f"API Response: {response.status_code}")
-        return json.dumps(result, indent=2)
-        
+
+        # The backend already sent valid JSON; pass it through untouched
+        # rather than buffering it a second and third time as a parsed
+        # object and a re-encoded string. Pretty DEBUG output still goes
+        # through the reformat path.
+        if raw and not _JSON_OPTS:
+            return response.text
+        return _dumps(orjson.loads(response.content))
+
     except httpx.HTTPStatusError as e:
         error_body = e.response.text
         try:
@@ -124,325 +341,387 @@ async def api_request(method: str, endpoint: str, **kwargs) -> str:
             error_msg = error_json.get("message", error_json.get("error", error_body))
         except Exception:
             error_msg = error_body
-        
+
         logger.error(f"API Error {e.response.status_code}: {error_msg}")
         raise Exception(f"API Error ({e.response.status_code}): {error_msg}")
-        
+
     except httpx.ConnectError as e:
         logger.error(f"Connection error: {e}")
         raise Exception(f"Failed to connect to IceMail API: {e}")
-        
+
     except httpx.TimeoutException as e:
         logger.error(f"Request timeout: {e}")
         raise Exception(f"Request timed out after {REQUEST_TIMEOUT}s")
-        
+
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         raise Exception(f"Unexpected error: {e}")
 
 
-# ============== User & Workspace Tools ==============
-
-@mcp.tool()
-async def get_user_workspaces(user: str = Field(description="User email address")) -> str:
-    """Get all workspaces for a user"""
-    return await api_request("post", "/get-user-workspace", json={"user": user})
-
-
-@mcp.tool()
-async def get_user_by_domain(domain: str = Field(description="Domain name to look up")) -> str:
-    """Get user information by domain"""
-    return await api_request("get", "/user", params={"domain": domain})
-
-
-@mcp.tool()
-async def get_user_by_mailbox(mailbox: str = Field(description="Mailbox email address to look up")) -> str:
-    """Get user information by mailbox"""
-    return await api_request("get", "/user", params={"mailbox": mailbox})
-
-
-# ============== Wallet Tools ==============
-
-@mcp.tool()
-async def add_wallet_credits(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    amount: float = Field(description="Amount to add"),
-    description: Optional[str] = Field(default="", description="Description for the transaction")
-) -> str:
-    """Add credits to a user's wallet"""
-    return await api_request("post", "/add-wallet-credits", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "amount": amount,
-        "description": description or ""
-    })
-
-
-@mcp.tool()
-async def subtract_wallet_credits(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    amount: float = Field(description="Amount to subtract"),
-    description: Optional[str] = Field(default="", description="Description for the transaction")
-) -> str:
-    """Subtract credits from a user's wallet"""
-    return await api_request("post", "/subtract-wallet-credits", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "amount": amount,
-        "description": description or ""
-    })
-
-
-# ============== Mailbox Purchase Tools ==============
-
-@mcp.tool()
-async def buy_google_mailbox(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    next_billing_date: str = Field(description="Next billing date (YYYY-MM-DD)"),
-    quantity: int = Field(description="Number of mailboxes to purchase"),
-    billing_cycle: str = Field(description="Billing cycle: MONTHLY or YEARLY"),
-    admin_panel: bool = Field(default=False, description="Whether to enable admin panel")
-) -> str:
-    """Purchase Google mailboxes for a workspace"""
-    return await api_request("post", "/buy-google-mailbox", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "next_billing_date": next_billing_date,
-        "quantity": quantity,
-        "admin_panel": admin_panel,
-        "billing_cycle": billing_cycle
-    })
-
-
-@mcp.tool()
-async def buy_microsoft_mailbox(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    next_billing_date: str = Field(description="Next billing date (YYYY-MM-DD)"),
-    quantity: int = Field(description="Number of mailboxes to purchase"),
-    billing_cycle: str = Field(description="Billing cycle: MONTHLY or YEARLY"),
-    admin_panel: bool = Field(default=False, description="Whether to enable admin panel")
-) -> str:
-    """Purchase Microsoft mailboxes for a workspace"""
-    return await api_request("post", "/buy-microsoft-mailbox", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "next_billing_date": next_billing_date,
-        "quantity": quantity,
-        "admin_panel": admin_panel,
-        "billing_cycle": billing_cycle
-    })
-
-
-@mcp.tool()
-async def buy_custom_mailbox(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    next_billing_date: str = Field(description="Next billing date (YYYY-MM-DD)"),
-    quantity: int = Field(description="Number of mailboxes to purchase"),
-    billing_cycle: str = Field(description="Billing cycle: MONTHLY or YEARLY"),
-    admin_panel: bool = Field(default=False, description="Whether to enable admin panel")
-) -> str:
-    """Purchase custom mailboxes for a workspace"""
-    return await api_request("post", "/buy-custom-mailbox", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "next_billing_date": next_billing_date,
-        "quantity": quantity,
-        "admin_panel": admin_panel,
-        "billing_cycle": billing_cycle
-    })
-
-
-@mcp.tool()
-async def delete_mailbox_purchase(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    usernames: list[str] = Field(description="Array of mailbox usernames to delete")
-) -> str:
-    """Delete mailbox purchases"""
-    return await api_request("post", "/delete-mailbox-purchase", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "usernames": usernames
-    })
-
-
-# ============== Mailbox Status Tools ==============
-
-@mcp.tool()
-async def set_export_active(
-    user: str = Field(description="User email address"),
-    workspace_id: str = Field(description="Workspace UUID"),
-    export_id: str = Field(description="Export ID"),
-    usernames: list[str] = Field(description="Array of mailbox usernames")
-) -> str:
-    """Set export as active for specified usernames"""
-    return await api_request("put", "/set-export-active", json={
-        "user": user,
-        "workspace_id": workspace_id,
-        "export_id": export_id,
-        "usernames": usernames
-    })
-
-
-@mcp.tool()
-async def set_mailbox_active(
-    user: str = Field(description="User email address"),
-    usernames: list[str] = Field(description="Array of mailbox usernames to activate")
-) -> str:
-    """Set mailboxes as active"""
-    return await api_request("put", "/set-mailbox-active", json={
-        "user": user,
-        "usernames": usernames
-    })
-
-
-@mcp.tool()
-async def mailbox_reactivate(
-    user: str = Field(description="User email address"),
-    unit_price: str = Field(description="Unit price for the mailbox"),
-    next_billing_date: str = Field(description="Next billing date (YYYY-MM-DD)"),
-    usernames: list[str] = Field(description="Array of mailbox usernames to reactivate")
-) -> str:
-    """Reactivate mailboxes with new billing settings"""
-    return await api_request("put", "/mailbox-reactivate", json={
-        "user": user,
-        "unit_price": unit_price,
-        "next_billing_date": next_billing_date,
-        "usernames": usernames
-    })
-
-
-@mcp.tool()
-async def mailbox_deactivate(
-    user: str = Field(description="User email address"),
-    usernames: list[str] = Field(description="Array of mailbox usernames to deactivate")
-) -> str:
-    """Deactivate mailboxes"""
-    return await api_request("put", "/mailbox-deactivate", json={
-        "user": user,
-        "usernames": usernames
-    })
-
-
-# ============== Domain Tools ==============
-
-@mcp.tool()
-async def get_domain_map(
-    domains: list[str] = Field(description="Array of domain names")
-) -> str:
-    """Get domain IDs for a list of domains"""
-    return await api_request("post", "/get-domain-map", json={"domains": domains})
-
-
-@mcp.tool()
-async def trigger_dkim(
-    domains: list[str] = Field(description="Array of domain names")
-) -> str:
-    """Trigger DKIM setup for domains"""
-    return await api_request("post", "/trigger-dkim", json={"domains": domains})
-
-
-@mcp.tool()
-async def google_authenticate(
-    domains: list[str] = Field(description="Array of domain names")
-) -> str:
-    """Trigger Google authentication for domains"""
-    return await api_request("post", "/google-authenticate", json={"domains": domains})
-
-
-@mcp.tool()
-async def domain_republish(
-    domains: list[str] = Field(description="Array of domain names")
-) -> str:
-    """Republish/retrigger domain setup"""
-    return await api_request("post", "/domain-republish", json={"domains": domains})
-
-
-@mcp.tool()
-async def domain_dns_flags(
-    user: str = Field(description="User email address"),
-    domains: list[str] = Field(description="Array of domain names"),
-    spf: Optional[bool] = Field(default=None, description="SPF flag"),
-    dmarc: Optional[bool] = Field(default=None, description="DMARC flag"),
-    mx_records: Optional[bool] = Field(default=None, description="MX records flag")
-) -> str:
-    """Update DNS flags for domains"""
-    payload = {"user": user, "domains": domains}
-    if spf is not None:
-        payload["spf"] = spf
-    if dmarc is not None:
-        payload["dmarc"] = dmarc
-    if mx_records is not None:
-        payload["mx_records"] = mx_records
-    
-    return await api_request("put", "/domain-dns-flags", json=payload)
-
-
-@mcp.tool()
-async def clean_domain(
-    user: str = Field(description="User email address"),
-    domains: list[str] = Field(description="Array of domain names to clean")
-) -> str:
-    """Clean domain data"""
-    return await api_request("post", "/clean-domain", json={
-        "user": user,
-        "domains": domains
-    })
-
-
-# ============== Security & Authentication Tools ==============
-
-@mcp.tool()
-async def trigger_2fa(
-    user: str = Field(description="User email address"),
-    usernames: list[str] = Field(description="Array of mailbox usernames")
-) -> str:
-    """Trigger 2FA setup for mailboxes"""
-    return await api_request("post", "/trigger-2fa", json={
-        "user": user,
-        "usernames": usernames
-    })
-
-
-@mcp.tool()
-async def make_profile_public(
-    user: str = Field(description="User email address"),
-    usernames: list[str] = Field(description="Array of mailbox usernames")
-) -> str:
-    """Make mailbox profiles public"""
-    return await api_request("post", "/make-profile-public", json={
-        "user": user,
-        "usernames": usernames
-    })
-
-
-@mcp.tool()
-async def set_secret_key(
-    user: str = Field(description="User email address"),
-    data: list[dict] = Field(description="Array of {username, secret_key} pairs for 2FA")
-) -> str:
-    """Set secret keys for mailboxes (2FA)"""
-    return await api_request("put", "/set-secret-key", json={
-        "user": user,
-        "data": data
-    })
+# ============== Tool Definitions ==============
+
+# Every tool is a thin shim around api_request(), so they are declared
+# as table entries and generated in a loop instead of ~400 lines of
+# near-identical hand-written wrappers. Each entry:
+#
+#   name / doc      MCP tool name and docstring
+#   method / path   HTTP method and endpoint
+#   params          [(arg name, annotation, Field), ...] in signature order
+#   send            "params" for querystring (GET) instead of JSON body
+#   cached          route through cached_request() (read-only lookups)
+#   fanout          list arg to chunk via _fanout() when ICEMAIL_FANOUT=1
+#   omit_none       payload keys dropped when the argument is None
+
+_TOOLS = [
+    # --- User & workspace ---
+    {
+        "name": "get_user_workspaces",
+        "doc": "Get all workspaces for a user",
+        "method": "post",
+        "path": "/get-user-workspace",
+        "params": [("user", str, Field(description="User email address"))],
+        "cached": True,
+    },
+    {
+        "name": "get_user_by_domain",
+        "doc": "Get user information by domain",
+        "method": "get",
+        "path": "/user",
+        "params": [("domain", str, Field(description="Domain name to look up"))],
+        "send": "params",
+        "cached": True,
+    },
+    {
+        "name": "get_user_by_mailbox",
+        "doc": "Get user information by mailbox",
+        "method": "get",
+        "path": "/user",
+        "params": [("mailbox", str, Field(description="Mailbox email address to look up"))],
+        "send": "params",
+        "cached": True,
+    },
+    # --- Wallet ---
+    {
+        "name": "add_wallet_credits",
+        "doc": "Add credits to a user's wallet",
+        "method": "post",
+        "path": "/add-wallet-credits",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("amount", float, Field(description="Amount to add")),
+            ("description", str, Field(default="", description="Description for the transaction")),
+        ],
+    },
+    {
+        "name": "subtract_wallet_credits",
+        "doc": "Subtract credits from a user's wallet",
+        "method": "post",
+        "path": "/subtract-wallet-credits",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("amount", float, Field(description="Amount to subtract")),
+            ("description", str, Field(default="", description="Description for the transaction")),
+        ],
+    },
+    # --- Mailbox purchase ---
+    {
+        "name": "buy_google_mailbox",
+        "doc": "Purchase Google mailboxes for a workspace",
+        "method": "post",
+        "path": "/buy-google-mailbox",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("next_billing_date", str, Field(description="Next billing date (YYYY-MM-DD)")),
+            ("quantity", int, Field(description="Number of mailboxes to purchase")),
+            ("billing_cycle", str, Field(description="Billing cycle: MONTHLY or YEARLY")),
+            ("admin_panel", bool, Field(default=False, description="Whether to enable admin panel")),
+        ],
+    },
+    {
+        "name": "buy_microsoft_mailbox",
+        "doc": "Purchase Microsoft mailboxes for a workspace",
+        "method": "post",
+        "path": "/buy-microsoft-mailbox",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("next_billing_date", str, Field(description="Next billing date (YYYY-MM-DD)")),
+            ("quantity", int, Field(description="Number of mailboxes to purchase")),
+            ("billing_cycle", str, Field(description="Billing cycle: MONTHLY or YEARLY")),
+            ("admin_panel", bool, Field(default=False, description="Whether to enable admin panel")),
+        ],
+    },
+    {
+        "name": "buy_custom_mailbox",
+        "doc": "Purchase custom mailboxes for a workspace",
+        "method": "post",
+        "path": "/buy-custom-mailbox",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("next_billing_date", str, Field(description="Next billing date (YYYY-MM-DD)")),
+            ("quantity", int, Field(description="Number of mailboxes to purchase")),
+            ("billing_cycle", str, Field(description="Billing cycle: MONTHLY or YEARLY")),
+            ("admin_panel", bool, Field(default=False, description="Whether to enable admin panel")),
+        ],
+    },
+    {
+        "name": "delete_mailbox_purchase",
+        "doc": "Delete mailbox purchases",
+        "method": "post",
+        "path": "/delete-mailbox-purchase",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames to delete")),
+        ],
+        "fanout": "usernames",
+    },
+    # --- Mailbox status ---
+    {
+        "name": "set_export_active",
+        "doc": "Set export as active for specified usernames",
+        "method": "put",
+        "path": "/set-export-active",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("workspace_id", str, Field(description="Workspace UUID")),
+            ("export_id", str, Field(description="Export ID")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames")),
+        ],
+    },
+    {
+        "name": "set_mailbox_active",
+        "doc": "Set mailboxes as active",
+        "method": "put",
+        "path": "/set-mailbox-active",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames to activate")),
+        ],
+    },
+    {
+        "name": "mailbox_reactivate",
+        "doc": "Reactivate mailboxes with new billing settings",
+        "method": "put",
+        "path": "/mailbox-reactivate",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("unit_price", str, Field(description="Unit price for the mailbox")),
+            ("next_billing_date", str, Field(description="Next billing date (YYYY-MM-DD)")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames to reactivate")),
+        ],
+    },
+    {
+        "name": "mailbox_deactivate",
+        "doc": "Deactivate mailboxes",
+        "method": "put",
+        "path": "/mailbox-deactivate",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames to deactivate")),
+        ],
+    },
+    # --- Domain ---
+    {
+        "name": "get_domain_map",
+        "doc": "Get domain IDs for a list of domains",
+        "method": "post",
+        "path": "/get-domain-map",
+        "params": [("domains", list[str], Field(description="Array of domain names"))],
+        "cached": True,
+    },
+    {
+        "name": "trigger_dkim",
+        "doc": "Trigger DKIM setup for domains",
+        "method": "post",
+        "path": "/trigger-dkim",
+        "params": [("domains", list[str], Field(description="Array of domain names"))],
+        "fanout": "domains",
+    },
+    {
+        "name": "google_authenticate",
+        "doc": "Trigger Google authentication for domains",
+        "method": "post",
+        "path": "/google-authenticate",
+        "params": [("domains", list[str], Field(description="Array of domain names"))],
+        "fanout": "domains",
+    },
+    {
+        "name": "domain_republish",
+        "doc": "Republish/retrigger domain setup",
+        "method": "post",
+        "path": "/domain-republish",
+        "params": [("domains", list[str], Field(description="Array of domain names"))],
+    },
+    {
+        "name": "domain_dns_flags",
+        "doc": "Update DNS flags for domains",
+        "method": "put",
+        "path": "/domain-dns-flags",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("domains", list[str], Field(description="Array of domain names")),
+            ("spf", Optional[bool], Field(default=None, description="SPF flag")),
+            ("dmarc", Optional[bool], Field(default=None, description="DMARC flag")),
+            ("mx_records", Optional[bool], Field(default=None, description="MX records flag")),
+        ],
+        "omit_none": ("spf", "dmarc", "mx_records"),
+    },
+    {
+        "name": "clean_domain",
+        "doc": "Clean domain data",
+        "method": "post",
+        "path": "/clean-domain",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("domains", list[str], Field(description="Array of domain names to clean")),
+        ],
+    },
+    # --- Security & authentication ---
+    {
+        "name": "trigger_2fa",
+        "doc": "Trigger 2FA setup for mailboxes",
+        "method": "post",
+        "path": "/trigger-2fa",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames")),
+        ],
+        "fanout": "usernames",
+    },
+    {
+        "name": "make_profile_public",
+        "doc": "Make mailbox profiles public",
+        "method": "post",
+        "path": "/make-profile-public",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("usernames", list[str], Field(description="Array of mailbox usernames")),
+        ],
+    },
+    {
+        "name": "set_secret_key",
+        "doc": "Set secret keys for mailboxes (2FA)",
+        "method": "put",
+        "path": "/set-secret-key",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("data", list[dict], Field(description="Array of {username, secret_key} pairs for 2FA")),
+        ],
+    },
+    {
+        "name": "set_app_password",
+        "doc": "Set app passwords for mailboxes",
+        "method": "put",
+        "path": "/set-app-password",
+        "params": [
+            ("user", str, Field(description="User email address")),
+            ("data", list[dict], Field(description="Array of {username, app_password} pairs")),
+        ],
+    },
+]
+
+
+async def _dispatch(spec: dict, args: dict) -> str:
+    """Route a generated tool's arguments to the right request path."""
+    method, path = spec["method"], spec["path"]
+
+    if spec.get("send") == "params":
+        if spec.get("cached"):
+            return await cached_request(spec["name"], method, path, params=args)
+        return await api_request(method, path, params=args)
+
+    # Build the payload in one pass; filtering during construction beats
+    # inserting then deleting keys from an already-sized dict.
+    omit = spec.get("omit_none")
+    if omit:
+        payload = {k: v for k, v in args.items() if k not in omit or v is not None}
+    else:
+        payload = dict(args)
+
+    fanout_key = spec.get("fanout")
+    if fanout_key and FANOUT_ENABLED and len(payload[fanout_key]) > _FANOUT_CHUNK:
+        items = payload.pop(fanout_key)
+        return await _fanout(method, path, items, fanout_key, base=payload or None)
+
+    if spec.get("cached"):
+        return await cached_request(spec["name"], method, path, json=payload)
+    return await api_request(method, path, json=payload)
+
+
+def _make_tool(spec: dict) -> None:
+    """Build one @mcp.tool coroutine from its table entry."""
+    params = spec["params"]
+    sig = ", ".join(f"{name}: _ann[{i}] = _def[{i}]" for i, (name, _, _) in enumerate(params))
+    payload = ", ".join(f"{name!r}: {name}" for name, _, _ in params)
+    src = (
+        f"async def {spec['name']}({sig}) -> str:\n"
+        f"    return await _dispatch(_spec, {{{payload}}})\n"
+    )
+    ns = {
+        "_ann": [annotation for _, annotation, _ in params],
+        "_def": [default for _, _, default in params],
+        "_spec": spec,
+        "_dispatch": _dispatch,
+    }
+    exec(compile(src, f"<tool {spec['name']}>", "exec"), ns)
+    fn = ns[spec["name"]]
+    fn.__doc__ = spec["doc"]
+    mcp.tool()(fn)
+
+
+for _spec in _TOOLS:
+    _make_tool(_spec)
+
+
+# ============== Batch Tools ==============
+
+# Operations an LLM tends to invoke repeatedly for distinct workspaces.
+# Maps op name -> (HTTP method, endpoint) so batch_ops can dispatch them
+# through the same api_request() path as the individual tools.
+_BATCH_OPS = {
+    "trigger_dkim": ("post", "/trigger-dkim"),
+    "google_authenticate": ("post", "/google-authenticate"),
+    "domain_republish": ("post", "/domain-republish"),
+    "trigger_2fa": ("post", "/trigger-2fa"),
+    "set_mailbox_active": ("put", "/set-mailbox-active"),
+    "mailbox_deactivate": ("put", "/mailbox-deactivate"),
+}
 
 
 @mcp.tool()
-async def set_app_password(
-    user: str = Field(description="User email address"),
-    data: list[dict] = Field(description="Array of {username, app_password} pairs")
+async def batch_ops(
+    ops: list[dict] = Field(description=(
+        "Array of {op, args} items. Supported ops: "
+        "trigger_dkim, google_authenticate, domain_republish, "
+        "trigger_2fa, set_mailbox_active, mailbox_deactivate. "
+        "args is the same JSON body the individual tool takes."
+    ))
 ) -> str:
-    """Set app passwords for mailboxes"""
-    return await api_request("put", "/set-app-password", json={
-        "user": user,
-        "data": data
-    })
+    """Run multiple operations concurrently in a single tool call"""
+    async def run_one(item: dict):
+        name = item.get("op")
+        if name not in _BATCH_OPS:
+            raise Exception(f"Unknown op: {name!r}")
+        method, endpoint = _BATCH_OPS[name]
+        return await api_request(method, endpoint, json=item.get("args") or {})
+
+    results = await asyncio.gather(
+        *(run_one(item) for item in ops),
+        return_exceptions=True
+    )
+
+    report = []
+    for item, result in zip(ops, results):
+        if isinstance(result, BaseException):
+            report.append({"op": item.get("op"), "ok": False, "error": str(result)})
+        else:
+            report.append({"op": item.get("op"), "ok": True, "result": orjson.loads(result)})
+    return _dumps(report)
 
 
 # ============== Entry Point ==============